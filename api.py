@@ -0,0 +1,223 @@
+"""HTTP API không giao diện cho pipeline chương (cho mobile và các client khác).
+
+Chạy: READER_API_TOKEN=... python api.py --port 8503 [--host 0.0.0.0] [--allow-host truyenhoan.com]
+
+Mọi endpoint /api/* cần header "Authorization: Bearer <token>" (READER_API_TOKEN hoặc
+--token; không đặt thì tạo ngẫu nhiên khi khởi động). Mặc định chỉ nghe trên 127.0.0.1.
+Chỉ tải URL trỏ tới địa chỉ public (kể cả sau redirect, và kiểm tra lại địa chỉ thật
+của mỗi kết nối để chặn DNS rebinding); READER_ALLOWED_HOSTS /
+--allow-host giới hạn thêm theo danh sách site truyện.
+
+Dùng chung pipeline, cache chương (file SQLite) và fetch pool với app.py; mỗi
+request chỉ tốn một coroutine thay vì một phiên Streamlit (websocket + thread).
+
+    POST /api/load_content          {"url": ..., "refresh": false}
+    POST /api/load_next_n_chapters  {"url": ..., "count": 3, "refresh": false}
+    POST /api/change_chapter_url    {"url": ..., "step": 1}
+    POST /api/chapters              {"urls": [...]} hoặc {"url": ..., "count": N}, "refresh" như trên
+                                    (Accept: application/x-ndjson hoặc ?stream=1 để nhận từng dòng)
+    GET  /healthz
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.iostream
+import tornado.web
+
+from reader import (
+    NO_CHAPTER_NUMBER,
+    BlockedURLError,
+    change_chapter_url,
+    check_url,
+    configure_url_policy,
+    get_chapter_number_from_url,
+    join_chapters,
+    next_chapter_urls,
+    submit_load,
+    submit_many,
+)
+
+MAX_BATCH = 50
+NDJSON = "application/x-ndjson"
+DNS_WORKERS = 8
+# Phân giải DNS cho check_url chạy trên executor riêng, có giới hạn; việc tải chương
+# chỉ chạy trong fetch pool nên handler không giữ thread nào trong lúc chờ.
+_dns_executor = ThreadPoolExecutor(max_workers=DNS_WORKERS, thread_name_prefix="dns")
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+
+    def prepare(self):
+        if not self.request.path.startswith("/api/"):
+            return
+        expected = f"Bearer {self.settings['api_token']}".encode()
+        given = self.request.headers.get("Authorization", "").encode()
+        if not hmac.compare_digest(given, expected):
+            raise tornado.web.HTTPError(401, "Thiếu hoặc sai token")
+
+    def write_error(self, status_code, **kwargs):
+        exc = kwargs.get("exc_info", (None, None))[1]
+        message = exc.log_message if isinstance(exc, tornado.web.HTTPError) and exc.log_message else self._reason
+        self.finish({"error": message})
+
+    def body_json(self) -> dict:
+        try:
+            data = json.loads(self.request.body or b"{}")
+        except ValueError:
+            raise tornado.web.HTTPError(400, "Body không phải JSON hợp lệ")
+        if not isinstance(data, dict):
+            raise tornado.web.HTTPError(400, "Body phải là một JSON object")
+        return data
+
+    def arg_url(self, data: dict) -> str:
+        url = (data.get("url") or "").strip()
+        if not url.startswith(("http://", "https://")):
+            raise tornado.web.HTTPError(400, "Thiếu hoặc sai 'url' (cần http/https)")
+        return url
+
+    async def check_urls(self, urls: list[str]) -> None:
+        """Chặn URL nội bộ / ngoài allowlist trước khi tải (phân giải DNS ngoài event loop)."""
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.gather(*(loop.run_in_executor(_dns_executor, check_url, u) for u in set(urls)))
+        except BlockedURLError as e:
+            raise tornado.web.HTTPError(403, str(e))
+
+    def arg_int(self, data: dict, name: str, default: int, low: int, high: int) -> int:
+        try:
+            value = int(data.get(name, default))
+        except (TypeError, ValueError):
+            raise tornado.web.HTTPError(400, f"'{name}' phải là số nguyên")
+        if not low <= value <= high:
+            raise tornado.web.HTTPError(400, f"'{name}' phải trong khoảng {low}..{high}")
+        return value
+
+    def load_chapters(self, urls: list[str], data: dict) -> list[asyncio.Future]:
+        """Đưa một lô chương vào fetch pool; trả về future asyncio theo đúng thứ tự urls."""
+        return [asyncio.wrap_future(f) for f in submit_many(urls, not data.get("refresh", False))]
+
+
+def chapter_payload(url: str, text: str, err: str) -> dict:
+    return {"url": url, "chapter": get_chapter_number_from_url(url) or "", "text": text, "error": err}
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.write({"ok": True})
+
+
+class LoadContentHandler(BaseHandler):
+    async def post(self):
+        data = self.body_json()
+        url = self.arg_url(data)
+        await self.check_urls([url])
+        text, err = await asyncio.wrap_future(submit_load(url, not data.get("refresh", False)))
+        self.write(chapter_payload(url, text, err))
+
+
+class LoadNextHandler(BaseHandler):
+    async def post(self):
+        data = self.body_json()
+        url = self.arg_url(data)
+        urls = next_chapter_urls(url, self.arg_int(data, "count", 1, 1, MAX_BATCH))
+        if not urls:
+            self.write({"final_url": url, "text": "", "error": NO_CHAPTER_NUMBER})
+            return
+        await self.check_urls(urls)
+        results = await asyncio.gather(*self.load_chapters(urls, data))
+        final_url, text = join_chapters(urls, results)
+        self.write({"final_url": final_url, "text": text, "error": ""})
+
+
+class ChangeUrlHandler(BaseHandler):
+    def post(self):
+        data = self.body_json()
+        url = self.arg_url(data)
+        step = self.arg_int(data, "step", 1, -MAX_BATCH, MAX_BATCH)
+        self.write({"url": change_chapter_url(url, step)})
+
+
+class ChaptersHandler(BaseHandler):
+    """Tải nhiều chương qua fetch pool (giới hạn slot theo host và theo lô);
+    JSON gộp hoặc NDJSON từng chương khi xong."""
+
+    async def post(self):
+        data = self.body_json()
+        if "urls" in data:
+            urls = data["urls"]
+            if not isinstance(urls, list) or not all(isinstance(u, str) for u in urls):
+                raise tornado.web.HTTPError(400, "'urls' phải là danh sách chuỗi")
+            urls = [self.arg_url({"url": u}) for u in urls]
+        else:
+            urls = next_chapter_urls(self.arg_url(data), self.arg_int(data, "count", 1, 1, MAX_BATCH))
+            if not urls:
+                raise tornado.web.HTTPError(400, NO_CHAPTER_NUMBER)
+        if not 1 <= len(urls) <= MAX_BATCH:
+            raise tornado.web.HTTPError(400, f"Số chương phải trong khoảng 1..{MAX_BATCH}")
+        await self.check_urls(urls)
+        futures = self.load_chapters(urls, data)
+
+        stream = self.get_query_argument("stream", "") in ("1", "true") or NDJSON in self.request.headers.get("Accept", "")
+        if not stream:
+            results = await asyncio.gather(*futures)
+            self.write({"chapters": [chapter_payload(u, t, e) for u, (t, e) in zip(urls, results)]})
+            return
+
+        self.set_header("Content-Type", NDJSON + "; charset=utf-8")
+        index_of = {f: i for i, f in enumerate(futures)}
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    i = index_of[fut]
+                    text, err = fut.result()
+                    line = {"index": i, **chapter_payload(urls[i], text, err)}
+                    self.write(json.dumps(line, ensure_ascii=False) + "\n")
+                await self.flush()
+        except tornado.iostream.StreamClosedError:
+            for fut in pending:
+                fut.cancel()  # client ngắt kết nối: bỏ các chương chưa bắt đầu
+
+
+def make_app(api_token: str) -> tornado.web.Application:
+    return tornado.web.Application([
+        (r"/healthz", HealthHandler),
+        (r"/api/load_content", LoadContentHandler),
+        (r"/api/load_next_n_chapters", LoadNextHandler),
+        (r"/api/change_chapter_url", ChangeUrlHandler),
+        (r"/api/chapters", ChaptersHandler),
+    ], api_token=api_token)
+
+
+async def main(host: str, port: int, api_token: str) -> None:
+    make_app(api_token).listen(port, address=host)
+    print(f"[+] API on http://{host}:{port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP API đọc chương")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8503)
+    parser.add_argument("--token", default=os.environ.get("READER_API_TOKEN", ""))
+    parser.add_argument(
+        "--allow-host",
+        action="append",
+        default=[h for h in os.environ.get("READER_ALLOWED_HOSTS", "").split(",") if h.strip()],
+        help="chỉ cho phép tải từ host này (lặp lại được)",
+    )
+    args = parser.parse_args()
+    configure_url_policy(public_only=True, allowed_hosts=args.allow_host)
+    token = args.token
+    if not token:
+        token = secrets.token_urlsafe(24)
+        print(f"[+] READER_API_TOKEN chưa đặt, dùng token tạm: {token}")
+    asyncio.run(main(args.host, args.port, token))
@@ -0,0 +1,92 @@
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+
+
+class FairFetchPool:
+    """Thread pool chia slot công bằng giữa các host và giữa các lô.
+
+    Mỗi host giữ tối đa `per_host` worker cùng lúc; việc thừa nằm trong hàng đợi
+    riêng của host (ngoài pool) nên một host bị throttle (worker ngủ trong
+    HostLimiter.acquire) không chặn host khác. `submit_batch` giới hạn thêm số
+    việc đang chạy của một lô để một client không chiếm hết pool.
+    """
+
+    def __init__(self, max_workers: int = 16, per_host: int = 4):
+        self.per_host = per_host
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self._lock = threading.Lock()
+        self._running: dict[str, int] = {}
+        self._queues: dict[str, deque] = {}
+
+    def submit(self, key: str, fn, *args) -> Future:
+        """Chạy fn(*args) khi host `key` còn slot; Future hủy được khi còn trong hàng đợi."""
+        future = Future()
+        job = (future, fn, args)
+        with self._lock:
+            if self._running.get(key, 0) < self.per_host:
+                self._running[key] = self._running.get(key, 0) + 1
+            else:
+                self._queues.setdefault(key, deque()).append(job)
+                return future
+        self._executor.submit(self._run, key, job)
+        return future
+
+    def _run(self, key: str, job) -> None:
+        future, fn, args = job
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            self._next(key)
+
+    def _next(self, key: str) -> None:
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                self._queues.pop(key, None)
+                self._running[key] -= 1
+                if not self._running[key]:
+                    del self._running[key]
+                return
+            job = queue.popleft()
+        self._executor.submit(self._run, key, job)
+
+    def submit_batch(self, jobs: list[tuple], max_parallel: int) -> list[Future]:
+        """jobs = [(key, fn, args), ...]; chạy tối đa max_parallel việc của lô cùng lúc.
+
+        Trả về Future theo đúng thứ tự jobs; hủy Future chưa chạy thì bỏ qua việc đó.
+        """
+        outer = [Future() for _ in jobs]
+        pending = deque(range(len(jobs)))
+        lock = threading.Lock()
+
+        def launch_next(_=None) -> None:
+            with lock:
+                i = None
+                while pending:
+                    j = pending.popleft()
+                    if outer[j].set_running_or_notify_cancel():
+                        i = j
+                        break
+            if i is None:
+                return
+            key, fn, args = jobs[i]
+            inner = self.submit(key, fn, *args)
+            inner.add_done_callback(lambda f, i=i: (_copy_result(f, outer[i]), launch_next()))
+
+        for _ in range(min(max_parallel, len(jobs))):
+            launch_next()
+        return outer
+
+
+def _copy_result(src: Future, dst: Future) -> None:
+    if src.cancelled():
+        dst.set_exception(CancelledError())
+    elif src.exception() is not None:
+        dst.set_exception(src.exception())
+    else:
+        dst.set_result(src.result())
@@ -0,0 +1,151 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+BACKOFF_STATUSES = (429, 503)
+MAX_RETRY_AFTER = 120.0
+
+
+class RateLimitTimeout(Exception):
+    """Không lấy được lượt gọi cho host trước deadline (host đang bị chặn hoặc quá tải)."""
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After dạng số giây hoặc HTTP-date -> số giây cần chờ (None nếu không hợp lệ)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return min(float(value), MAX_RETRY_AFTER)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return min(max(0.0, when.timestamp() - time.time()), MAX_RETRY_AFTER)
+
+
+class HostLimiter:
+    """Token bucket + giới hạn số request đồng thời (AIMD) cho một host.
+
+    - Phản hồi khỏe: tăng cộng (concurrency += 1/limit, rate += rate_step).
+    - 429/503, lỗi mạng hoặc độ trễ tăng vọt: giảm nhân (x backoff_factor).
+    - 429/503 còn chặn host tới hết Retry-After (hoặc backoff lũy thừa nếu thiếu).
+    """
+
+    def __init__(
+        self,
+        host: str = "",
+        rate: float = 2.0,
+        burst: float = 4.0,
+        min_rate: float = 0.2,
+        max_rate: float = 10.0,
+        rate_step: float = 0.1,
+        concurrency: float = 2.0,
+        min_concurrency: float = 1.0,
+        max_concurrency: float = 8.0,
+        backoff_factor: float = 0.5,
+        latency_spike: float = 3.0,
+    ):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate_step = rate_step
+        self.limit = concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.backoff_factor = backoff_factor
+        self.latency_spike = latency_spike
+
+        self.tokens = burst
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.avg_latency = 0.0
+        self.failures = 0
+        self._last_refill = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self, deadline: float | None = None) -> None:
+        """Chờ tới khi host hết bị chặn, còn slot đồng thời và còn token.
+
+        `deadline` theo time.monotonic(): nếu host bị chặn (Retry-After) quá deadline
+        thì báo lỗi ngay thay vì ngủ chờ; các chờ khác cũng không vượt deadline.
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    if deadline is not None and self.blocked_until > deadline:
+                        raise RateLimitTimeout(
+                            f"{self.host or 'host'} yêu cầu chờ {self.blocked_until - now:.0f}s (429/503), "
+                            "vượt thời gian cho phép"
+                        )
+                    wait = self.blocked_until - now
+                elif self.in_flight >= int(self.limit):
+                    wait = None  # đợi release()
+                elif self.tokens < 1.0:
+                    wait = (1.0 - self.tokens) / self.rate
+                else:
+                    self.tokens -= 1.0
+                    self.in_flight += 1
+                    return
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise RateLimitTimeout(f"Hết thời gian chờ lượt gọi tới {self.host or 'host'}")
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+
+    def release(self, status: int | None, latency: float, retry_after: str | None = None) -> None:
+        """Ghi nhận kết quả một request; status=None nghĩa là lỗi mạng/timeout."""
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            if status in BACKOFF_STATUSES:
+                self.failures += 1
+                delay = parse_retry_after(retry_after)
+                if delay is None:
+                    delay = min(2.0 ** self.failures, MAX_RETRY_AFTER)
+                self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+                self.tokens = 0.0
+                self._decrease()
+            elif status is None:
+                self.failures += 1
+                self._decrease()
+            elif self.avg_latency and latency > self.latency_spike * self.avg_latency:
+                self._decrease()
+            else:
+                self.failures = 0
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+                self.rate = min(self.max_rate, self.rate + self.rate_step)
+            if status is not None:
+                # EWMA độ trễ làm mốc phát hiện tăng vọt
+                self.avg_latency = latency if not self.avg_latency else 0.8 * self.avg_latency + 0.2 * latency
+            self._cond.notify_all()
+
+    def _decrease(self) -> None:
+        self.limit = max(self.min_concurrency, self.limit * self.backoff_factor)
+        self.rate = max(self.min_rate, self.rate * self.backoff_factor)
+
+
+class RateLimiter:
+    """Bộ giới hạn theo host, dùng chung cho mọi đường gọi fetch_html."""
+
+    def __init__(self, **host_defaults):
+        self.host_defaults = host_defaults
+        self._hosts: dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url: str) -> HostLimiter:
+        host = (urlsplit(url).hostname or "").lower()
+        with self._lock:
+            limiter = self._hosts.get(host)
+            if limiter is None:
+                limiter = self._hosts[host] = HostLimiter(host, **self.host_defaults)
+            return limiter
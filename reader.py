@@ -0,0 +1,289 @@
+import atexit
+import ipaddress
+import re
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urljoin, urlsplit
+
+from fetchpool import FairFetchPool
+from ratelimit import BACKOFF_STATUSES, RateLimiter
+from store import ReadingStore
+
+# Pipeline tải/trích xuất chương dùng chung cho UI Streamlit (app.py) và HTTP API (api.py).
+# requests / bs4 / readability / lxml được import lười: chỉ tải khi thật sự fetch.
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) Safari/605.1.15"}
+FETCH_WORKERS = 16
+HOST_SLOTS = 4   # số worker tối đa một host giữ cùng lúc
+BATCH_SLOTS = 4  # số chương tối đa một lô (một lần "đọc tiếp" / một request API) chạy cùng lúc
+MAX_REDIRECTS = 5
+# văn bản ngắn hơn mức này (trang challenge/chặn bot, trang lỗi) thì không cache
+MIN_CACHE_CHARS = 200
+NO_CHAPTER_NUMBER = "Không tìm thấy số chương trong URL để tăng."
+
+# ===================== Tài nguyên dùng chung (mỗi process một bản) =====================
+_shared: dict = {}
+_shared_lock = threading.Lock()
+_thread_local = threading.local()
+
+def _get_shared(name: str, factory):
+    with _shared_lock:
+        if name not in _shared:
+            _shared[name] = factory()
+        return _shared[name]
+
+def _make_store() -> ReadingStore:
+    store = ReadingStore()
+    atexit.register(store.close)
+    return store
+
+def get_store() -> ReadingStore:
+    """Kho SQLite (vị trí đọc, chương gần đây, cache chương) — dùng chung giữa các process qua file DB."""
+    return _get_shared("store", _make_store)
+
+def get_rate_limiter() -> RateLimiter:
+    """Giới hạn tốc độ theo host cho mọi đường gọi fetch_html."""
+    return _get_shared("limiter", RateLimiter)
+
+def get_session():
+    """requests.Session riêng cho từng thread (Session không đảm bảo thread-safe);
+    mỗi thread của fetch pool vẫn giữ kết nối keep-alive của nó."""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        import requests
+
+        session = _thread_local.session = requests.Session()
+        adapter = _get_shared("peer_check_adapter", _make_peer_check_adapter)()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+    return session
+
+def get_fetch_pool() -> FairFetchPool:
+    """Pool cho các lượt tải chương (chỉ chạy tác vụ lá, không lồng nhau), chia slot theo host/lô."""
+    return _get_shared("pool", lambda: FairFetchPool(max_workers=FETCH_WORKERS, per_host=HOST_SLOTS))
+
+def host_of(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+# ===================== Chính sách URL =====================
+class BlockedURLError(ValueError):
+    """URL không được phép tải (sai scheme, host nội bộ hoặc ngoài allowlist)."""
+
+_url_policy = {"public_only": False, "allowed_hosts": ()}
+
+def configure_url_policy(public_only: bool = False, allowed_hosts=()) -> None:
+    """public_only: chỉ cho host phân giải ra địa chỉ public (chặn loopback, LAN, link-local…);
+    allowed_hosts: nếu có, chỉ cho các host này và subdomain của chúng. UI mặc định không giới hạn."""
+    _url_policy["public_only"] = public_only
+    _url_policy["allowed_hosts"] = tuple(h.strip().lower().lstrip(".") for h in allowed_hosts if h.strip())
+
+def check_url(url: str) -> None:
+    """Báo BlockedURLError nếu url không được phép theo chính sách hiện tại."""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        raise BlockedURLError(f"URL không hợp lệ: {url}")
+    allowed = _url_policy["allowed_hosts"]
+    if allowed and not any(host == h or host.endswith("." + h) for h in allowed):
+        raise BlockedURLError(f"Host không nằm trong danh sách cho phép: {host}")
+    if _url_policy["public_only"]:
+        try:
+            infos = socket.getaddrinfo(host, parts.port or (443 if parts.scheme == "https" else 80))
+        except (socket.gaierror, UnicodeError):
+            raise BlockedURLError(f"Không phân giải được host: {host}")
+        for info in infos:
+            ip = _as_ip(info[4][0])
+            if not ip.is_global:
+                raise BlockedURLError(f"Host trỏ tới địa chỉ nội bộ: {host} ({ip})")
+
+def _as_ip(addr: str):
+    ip = ipaddress.ip_address(addr.split("%")[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        return ip.ipv4_mapped
+    return ip
+
+def _make_peer_check_adapter():
+    """Lớp HTTPAdapter kiểm tra địa chỉ thật của mỗi kết nối mới theo public_only.
+
+    check_url phân giải DNS một lần, requests phân giải lại khi kết nối: host đổi bản
+    ghi (DNS rebinding) có thể qua check_url rồi trỏ vào 127.0.0.1/169.254.169.254.
+    Kiểm tra địa chỉ peer ngay sau connect (trước TLS và trước khi gửi request) chặn
+    trường hợp đó. Không áp dụng khi đi qua proxy (HTTP(S)_PROXY): lúc đó peer là proxy.
+    """
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    def checked(conn_cls):
+        class PeerCheckedConnection(conn_cls):
+            def _new_conn(self):
+                sock = super()._new_conn()
+                if _url_policy["public_only"]:
+                    ip = _as_ip(sock.getpeername()[0])
+                    if not ip.is_global:
+                        sock.close()
+                        raise BlockedURLError(f"Host trỏ tới địa chỉ nội bộ khi kết nối: {self.host} ({ip})")
+                return sock
+
+        return PeerCheckedConnection
+
+    class CheckedHTTPPool(HTTPConnectionPool):
+        ConnectionCls = checked(HTTPConnection)
+
+    class CheckedHTTPSPool(HTTPSConnectionPool):
+        ConnectionCls = checked(HTTPSConnection)
+
+    class PeerCheckAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {"http": CheckedHTTPPool, "https": CheckedHTTPSPool}
+
+    return PeerCheckAdapter
+
+# ===================== Pipeline =====================
+def _limited_get(url: str, deadline: float, retries: int):
+    """Một GET (không tự theo redirect) qua bộ giới hạn theo host; thử lại khi gặp 429/503."""
+    host = get_rate_limiter().for_url(url)
+    for attempt in range(retries + 1):
+        host.acquire(deadline)
+        started = time.monotonic()
+        status, retry_after = None, None
+        try:
+            r = get_session().get(
+                url, headers=HEADERS, timeout=max(1.0, deadline - started), allow_redirects=False
+            )
+            status, retry_after = r.status_code, r.headers.get("Retry-After")
+        finally:
+            host.release(status, time.monotonic() - started, retry_after)
+        if status not in BACKOFF_STATUSES or attempt == retries:
+            break
+    return r
+
+def fetch_html(url: str, timeout=25, retries=2) -> str:
+    """Tải HTML qua bộ giới hạn theo host; thử lại khi gặp 429/503 (chờ theo Retry-After).
+
+    `timeout` giới hạn cả lượt gọi, gồm thời gian chờ limiter và các lần thử lại.
+    Redirect được theo thủ công để mỗi bước đều qua check_url và limiter của host đích.
+    """
+    deadline = time.monotonic() + timeout
+    for _ in range(MAX_REDIRECTS + 1):
+        check_url(url)
+        r = _limited_get(url, deadline, retries)
+        if not r.is_redirect:
+            break
+        url = urljoin(url, r.headers["Location"])
+    else:
+        raise BlockedURLError(f"Quá nhiều lần chuyển hướng: {url}")
+    r.raise_for_status()
+    r.encoding = r.apparent_encoding or r.encoding
+    return r.text
+
+def clean_text(text: str) -> str:
+    text = re.sub(r"\u00A0", " ", text)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"([\.!?…])( )", r"\1\n", text)  # ngắt câu nhẹ cho dễ nghe
+    return text.strip()
+
+def extract_text_from_html(html_src: str) -> str:
+    from bs4 import BeautifulSoup
+    from readability import Document
+
+    doc = Document(html_src)
+    summary_html = doc.summary(html_partial=True)
+    soup = BeautifulSoup(summary_html, "lxml")
+    parts = [p.get_text(" ", strip=True) for p in soup.find_all(["p", "h2", "h3", "blockquote"])]
+    return clean_text("\n".join([t for t in parts if t]))
+
+def get_chapter_number_from_url(url: str) -> str | None:
+    m = re.search(r"chuong[-_ ]?(\d+)", url, re.IGNORECASE)
+    return m.group(1) if m else None
+
+def change_chapter_url(url: str, step: int = 1) -> str | None:
+    """Thay đổi số chương trong URL theo step (+1/-1), giữ padding (001->002)."""
+    m = re.match(r"^(.*?)(\?.*|#.*)?$", url)
+    if not m:
+        return None
+    base = m.group(1)
+    suffix = m.group(2) or ""
+    m2 = re.search(r"(\d+)(?!.*\d)", base)
+    if not m2:
+        return None
+    start, end = m2.span()
+    num_str = m2.group(1)
+    width = len(num_str)
+    num = int(num_str) + step
+    if num < 1:
+        num = 1
+    new_num = f"{num:0{width}d}"
+    return base[:start] + new_num + base[end:] + suffix
+
+def load_content(url: str, use_cache: bool = True) -> tuple[str, str]:
+    """Trả về (full_text, error_msg). Ưu tiên cache chương, use_cache=False để tải lại."""
+    store = get_store()
+    if use_cache:
+        cached = store.get_chapter(url)
+        if cached is not None:
+            return (cached, "")
+    try:
+        html_src = fetch_html(url)
+        txt = extract_text_from_html(html_src)
+        if len(txt) >= MIN_CACHE_CHARS:
+            store.put_chapter(url, txt)
+        return (txt if txt else "(Không trích xuất được nội dung)", "")
+    except Exception as e:
+        return ("", f"Lỗi khi tải {url}: {e}")
+
+def submit_load(url: str, use_cache: bool = True) -> Future:
+    """Đưa load_content vào fetch pool (theo slot của host)."""
+    return get_fetch_pool().submit(host_of(url), load_content, url, use_cache)
+
+def submit_many(urls: list[str], use_cache: bool = True) -> list[Future]:
+    """Đưa một lô chương vào fetch pool; tối đa BATCH_SLOTS chương của lô chạy cùng lúc."""
+    jobs = [(host_of(u), load_content, (u, use_cache)) for u in urls]
+    return get_fetch_pool().submit_batch(jobs, BATCH_SLOTS)
+
+def load_many(urls: list[str], use_cache: bool = True) -> list[tuple[str, str]]:
+    """Tải song song nhiều chương qua fetch pool; giữ đúng thứ tự urls."""
+    return [f.result() for f in submit_many(urls, use_cache)]
+
+def load_chapter_list(urls: list[str]) -> tuple[str, str]:
+    """Dựng lại văn bản của các chương đã ghép (dùng khi resume); trả về (text, error)."""
+    if len(urls) == 1:
+        return load_content(urls[0])
+    texts = [f"(Lỗi khi tải {url}: {err})" if err else txt for url, (txt, err) in zip(urls, load_many(urls))]
+    return ("\n\n".join(texts).strip(), "")
+
+def next_chapter_urls(base_url: str, count: int) -> list[str]:
+    """Danh sách URL của N chương kế tiếp (rỗng nếu URL không có số chương)."""
+    urls = []
+    url = base_url
+    for _ in range(count):
+        url = change_chapter_url(url, step=1)
+        if not url:
+            return []
+        urls.append(url)
+    return urls
+
+def join_chapters(urls: list[str], results: list[tuple[str, str]]) -> tuple[str, str]:
+    """Ghép kết quả (text, error) của các chương; trả về (final_url, text_gộp) với
+    final_url là chương cuối tải được (hoặc chương cuối nếu tất cả đều lỗi)."""
+    texts = []
+    last_ok_url = None
+    for url, (txt, err) in zip(urls, results):
+        if err:
+            texts.append(f"(Lỗi khi tải {url}: {err})")
+        else:
+            texts.append(txt)
+            last_ok_url = url
+    final_url = last_ok_url or urls[-1]
+    return (final_url, ("\n\n".join(texts).strip()))
+
+def load_next_n_chapters(base_url: str, count: int) -> tuple[str, str, str]:
+    """Tải N chương kế tiếp (song song); trả về (final_url, text_gộp, error)."""
+    urls = next_chapter_urls(base_url, count)
+    if not urls:
+        return (base_url, "", NO_CHAPTER_NUMBER)
+    final_url, text = join_chapters(urls, load_many(urls))
+    return (final_url, text, "")
@@ -0,0 +1,31 @@
+import os
+
+import streamlit.components.v1 as components
+
+# Component đọc (CSS + toolbar + JS) là file tĩnh trong frontend/: trình duyệt tải và
+# cache một lần; mỗi rerun chỉ gửi args. Component trả về {uid, doc, offset} để
+# Python lưu vị trí đọc trong lúc đang nghe.
+_FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+_doc_reader = components.declare_component("doc_reader", path=_FRONTEND_DIR)
+
+
+def doc_reader(
+    text: str,
+    doc: str,
+    auto_play: bool = False,
+    resume_offset: int = 0,
+    uid: str = "",
+    uid_forced: bool = False,
+    key: str | None = None,
+) -> dict | None:
+    """Hiển thị trình đọc; `doc` đổi thì component nạp lại văn bản, ngược lại giữ nguyên giọng đọc."""
+    return _doc_reader(
+        text=text,
+        doc=doc,
+        auto_play=bool(auto_play),
+        resume_offset=int(resume_offset),
+        uid=uid,
+        uid_forced=uid_forced,
+        key=key,
+        default=None,
+    )
@@ -16,10 +16,26 @@ source "$SCRIPT_DIR/.venv/bin/activate"
 python -m pip install --upgrade pip wheel
 pip install -r "$SCRIPT_DIR/requirements.txt"
 
+# ./run.sh test  -> cài thêm pytest và chạy toàn bộ test (gồm test API cần tornado)
+if [ "${1:-}" = "test" ]; then
+  pip install -r "$SCRIPT_DIR/requirements-dev.txt"
+  cd "$SCRIPT_DIR"
+  exec python -m pytest -q tests
+fi
+
 # Run Streamlit
 export PYTHONIOENCODING=utf-8
 export STREAMLIT_BROWSER_GATHER_USAGE_STATS=false
 
+# ./run.sh api  -> chạy HTTP API không giao diện (api.py) thay cho UI
+# (đặt READER_API_TOKEN; API_HOST=0.0.0.0 để mở cho client ngoài máy)
+if [ "${1:-}" = "api" ]; then
+  API_HOST="${API_HOST:-127.0.0.1}"
+  API_PORT="${API_PORT:-8503}"
+  echo "[+] Starting API on http://${API_HOST}:${API_PORT}"
+  exec python "$SCRIPT_DIR/api.py" --host "$API_HOST" --port "$API_PORT"
+fi
+
 PORT="${PORT:-8502}"
 echo "[+] Starting app on http://localhost:${PORT}"
 exec streamlit run "$SCRIPT_DIR/app.py" --server.port "$PORT" --server.headless true
\ No newline at end of file
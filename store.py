@@ -0,0 +1,241 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = os.environ.get(
+    "READER_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "reader_state.db"),
+)
+RECENT_LIMIT = 20
+CHAPTER_TTL = float(os.environ.get("READER_CHAPTER_TTL", 24 * 3600))  # giây
+MAX_CHAPTERS = int(os.environ.get("READER_MAX_CHAPTERS", 2000))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    user_id    TEXT PRIMARY KEY,
+    url        TEXT NOT NULL,
+    urls       TEXT NOT NULL,
+    offset     INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recent (
+    user_id   TEXT NOT NULL,
+    url       TEXT NOT NULL,
+    chapter   TEXT NOT NULL DEFAULT '',
+    opened_at REAL NOT NULL,
+    PRIMARY KEY (user_id, url)
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    url        TEXT PRIMARY KEY,
+    text       TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chapters_fetched_at ON chapters (fetched_at);
+"""
+
+
+def _empty_batch() -> dict:
+    return {"positions": {}, "offsets": {}, "recent": {}, "chapters": {}}
+
+
+class ReadingStore:
+    """Lưu vị trí đọc, danh sách chương gần đây và cache chương vào SQLite (WAL).
+
+    Ghi bất đồng bộ: các lệnh ghi được gom vào bộ đệm (ghi đè theo khóa) và một
+    thread nền flush theo lô mỗi `flush_interval` giây trong một transaction.
+    Đọc xét bộ đệm, rồi lô đang flush, rồi SQLite nên luôn thấy dữ liệu vừa ghi.
+    Cache chương hết hạn sau `chapter_ttl` giây và giữ tối đa `max_chapters` dòng
+    (bỏ các chương tải lâu nhất khi flush).
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_DB_PATH,
+        flush_interval: float = 1.0,
+        chapter_ttl: float = CHAPTER_TTL,
+        max_chapters: int = MAX_CHAPTERS,
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.chapter_ttl = chapter_ttl
+        self.max_chapters = max_chapters
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._pending = _empty_batch()
+        # lô đã lấy khỏi bộ đệm nhưng chưa commit: vẫn phải đọc được
+        self._inflight = _empty_batch()
+
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+        self._writer = threading.Thread(target=self._run, name="reading-store-writer", daemon=True)
+        self._writer.start()
+
+    # ---------- Kết nối ----------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _buffered(self, kind: str, key):
+        """Giá trị mới nhất của key trong bộ đệm hoặc lô đang flush (None nếu không có)."""
+        value = self._pending[kind].get(key)
+        return value if value is not None else self._inflight[kind].get(key)
+
+    # ---------- Ghi (gom lô) ----------
+    def save_position(self, user_id: str, url: str, urls: list[str] | None = None, offset: int = 0) -> None:
+        """Ghi URL hiện tại (và các chương đang ghép trong văn bản) cùng offset."""
+        with self._lock:
+            self._pending["positions"][user_id] = (url, json.dumps(urls or [url]), max(0, int(offset)), time.time())
+            self._pending["offsets"].pop(user_id, None)
+        self._wake.set()
+
+    def save_offset(self, user_id: str, offset: int) -> None:
+        """Chỉ cập nhật offset cho vị trí đã có (dùng cho các cập nhật dày từ component)."""
+        with self._lock:
+            pos = self._pending["positions"].get(user_id)
+            if pos:
+                self._pending["positions"][user_id] = (pos[0], pos[1], max(0, int(offset)), time.time())
+            else:
+                self._pending["offsets"][user_id] = max(0, int(offset))
+        self._wake.set()
+
+    def add_recent(self, user_id: str, url: str, chapter: str = "") -> None:
+        with self._lock:
+            self._pending["recent"][(user_id, url)] = (chapter or "", time.time())
+        self._wake.set()
+
+    def put_chapter(self, url: str, text: str) -> None:
+        with self._lock:
+            self._pending["chapters"][url] = (text, time.time())
+        self._wake.set()
+
+    # ---------- Đọc ----------
+    def get_position(self, user_id: str) -> dict | None:
+        """Trả về {"url", "urls", "offset", "updated_at"} hoặc None."""
+        with self._lock:
+            pos = self._pending["positions"].get(user_id)
+            offset = self._pending["offsets"].get(user_id)
+            if pos is None:
+                pos = self._inflight["positions"].get(user_id)
+                if offset is None:
+                    offset = self._inflight["offsets"].get(user_id)
+        if pos is None:
+            row = self._conn().execute(
+                "SELECT url, urls, offset, updated_at FROM positions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            pos = row
+        url, urls, saved_offset, updated_at = pos
+        return {
+            "url": url,
+            "urls": json.loads(urls) or [url],
+            "offset": saved_offset if offset is None else offset,
+            "updated_at": updated_at,
+        }
+
+    def recent(self, user_id: str, limit: int = 10) -> list[dict]:
+        """Danh sách chương mở gần đây, mới nhất trước."""
+        rows = self._conn().execute(
+            "SELECT url, chapter, opened_at FROM recent WHERE user_id = ?", (user_id,)
+        ).fetchall()
+        merged = {url: (chapter, opened_at) for url, chapter, opened_at in rows}
+        with self._lock:
+            for batch in (self._inflight, self._pending):
+                for (uid, url), value in batch["recent"].items():
+                    if uid == user_id:
+                        merged[url] = value
+        items = sorted(merged.items(), key=lambda kv: kv[1][1], reverse=True)[:limit]
+        return [{"url": url, "chapter": chapter, "opened_at": ts} for url, (chapter, ts) in items]
+
+    def get_chapter(self, url: str) -> str | None:
+        """Văn bản chương đã cache, None nếu chưa có hoặc đã quá chapter_ttl."""
+        with self._lock:
+            cached = self._buffered("chapters", url)
+        if cached is None:
+            cached = self._conn().execute("SELECT text, fetched_at FROM chapters WHERE url = ?", (url,)).fetchone()
+        if cached is None or time.time() - cached[1] > self.chapter_ttl:
+            return None
+        return cached[0]
+
+    # ---------- Flush nền ----------
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait()
+            # gom thêm các cập nhật tới trong khoảng flush_interval
+            time.sleep(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass  # giữ thread sống; lô sau sẽ thử lại
+
+    def flush(self) -> None:
+        """Ghi toàn bộ bộ đệm xuống SQLite trong một transaction."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, _empty_batch()
+                self._inflight = batch
+            try:
+                if any(batch.values()):
+                    self._write_batch(batch)
+            except sqlite3.Error:
+                # trả lại bộ đệm (không ghi đè dữ liệu mới hơn) để lô sau thử lại
+                with self._lock:
+                    for kind, items in batch.items():
+                        for k, v in items.items():
+                            self._pending[kind].setdefault(k, v)
+                raise
+            finally:
+                with self._lock:
+                    self._inflight = _empty_batch()
+
+    def _write_batch(self, batch: dict) -> None:
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO positions (user_id, url, urls, offset, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(uid, *pos) for uid, pos in batch["positions"].items()],
+            )
+            now = time.time()
+            conn.executemany(
+                "UPDATE positions SET offset = ?, updated_at = ? WHERE user_id = ?",
+                [(off, now, uid) for uid, off in batch["offsets"].items()],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO recent (user_id, url, chapter, opened_at) VALUES (?, ?, ?, ?)",
+                [(uid, url, chapter, ts) for (uid, url), (chapter, ts) in batch["recent"].items()],
+            )
+            for uid in {uid for uid, _ in batch["recent"]}:
+                conn.execute(
+                    "DELETE FROM recent WHERE user_id = ? AND url NOT IN "
+                    "(SELECT url FROM recent WHERE user_id = ? ORDER BY opened_at DESC LIMIT ?)",
+                    (uid, uid, RECENT_LIMIT),
+                )
+            conn.executemany(
+                "INSERT OR REPLACE INTO chapters (url, text, fetched_at) VALUES (?, ?, ?)",
+                [(url, text, ts) for url, (text, ts) in batch["chapters"].items()],
+            )
+            if batch["chapters"]:
+                conn.execute("DELETE FROM chapters WHERE fetched_at < ?", (now - self.chapter_ttl,))
+                conn.execute(
+                    "DELETE FROM chapters WHERE url IN "
+                    "(SELECT url FROM chapters ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_chapters,),
+                )
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+        self.flush()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# app.py chạy bằng `streamlit run` từ thư mục gốc; test import các module cạnh nó.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,129 @@
+import json
+from concurrent.futures import Future
+
+from tornado.testing import AsyncHTTPTestCase
+
+import api
+import reader
+
+TOKEN = "test-token"
+AUTH = {"Authorization": f"Bearer {TOKEN}"}
+
+
+def done(value) -> Future:
+    f = Future()
+    f.set_result(value)
+    return f
+
+
+class ApiTestCase(AsyncHTTPTestCase):
+    def setUp(self):
+        super().setUp()
+        reader.configure_url_policy(public_only=True)
+        self.submitted = []
+        self._patches = [(api, "submit_many", api.submit_many), (api, "check_url", api.check_url)]
+        api.submit_many = self.fake_submit_many
+
+    def tearDown(self):
+        for mod, name, value in self._patches:
+            setattr(mod, name, value)
+        reader.configure_url_policy()
+        super().tearDown()
+
+    def get_app(self):
+        return api.make_app(TOKEN)
+
+    def fake_submit_many(self, urls, use_cache=True):
+        self.submitted.append((list(urls), use_cache))
+        return [done(("", "404") if u.endswith("-3") else (f"text {u}", "")) for u in urls]
+
+    def post(self, path, body, headers=AUTH):
+        data = body if isinstance(body, (str, bytes)) else json.dumps(body)
+        return self.fetch(path, method="POST", body=data, headers=headers)
+
+    def allow_all_hosts(self):
+        api.check_url = lambda url: None
+
+    def test_requires_token(self):
+        assert self.fetch("/healthz").code == 200
+        assert self.post("/api/chapters", {"urls": ["https://x.example/chuong-1"]}, headers={}).code == 401
+        wrong = {"Authorization": "Bearer nope"}
+        assert self.post("/api/change_chapter_url", {"url": "https://x.example/chuong-1"}, headers=wrong).code == 401
+
+    def test_blocks_internal_hosts(self):
+        for url in ("http://127.0.0.1:8080/chuong-1", "http://169.254.169.254/latest", "http://10.0.0.5/chuong-2"):
+            r = self.post("/api/chapters", {"urls": [url]})
+            assert r.code == 403, url
+            assert "nội bộ" in json.loads(r.body)["error"]
+        assert self.post("/api/load_content", {"url": "http://[::1]/chuong-1"}).code == 403
+        assert self.submitted == []
+
+    def test_allowlist(self):
+        reader.configure_url_policy(allowed_hosts=["truyen.example"])
+        r = self.post("/api/chapters", {"urls": ["https://other.example/chuong-1"]})
+        assert r.code == 403
+        assert self.post("/api/chapters", {"urls": ["https://m.truyen.example/chuong-1"]}).code == 200
+
+    def test_chapters_bad_requests(self):
+        self.allow_all_hosts()
+        cases = [
+            "not json",
+            [1, 2],
+            {"urls": "https://x.example/chuong-1"},
+            {"urls": [1]},
+            {"urls": ["ftp://x.example/chuong-1"]},
+            {"urls": []},
+            {"urls": [f"https://x.example/chuong-{i}" for i in range(api.MAX_BATCH + 1)]},
+            {"url": "https://x.example/chuong-1", "count": 0},
+            {"url": "https://x.example/chuong-1", "count": "many"},
+            {"url": "https://x.example/no-number/"},
+        ]
+        for body in cases:
+            r = self.post("/api/chapters", body)
+            assert r.code == 400, body
+            assert json.loads(r.body)["error"]
+        assert self.submitted == []
+
+    def test_chapters_json(self):
+        self.allow_all_hosts()
+        r = self.post("/api/chapters", {"url": "https://x.example/chuong-1", "count": 2})
+        assert r.code == 200
+        chapters = json.loads(r.body)["chapters"]
+        assert [c["chapter"] for c in chapters] == ["2", "3"]
+        assert chapters[0]["text"] == "text https://x.example/chuong-2"
+
+    def test_chapters_ndjson_stream(self):
+        self.allow_all_hosts()
+        urls = [f"https://x.example/chuong-{i}" for i in range(1, 4)]
+        r = self.fetch(
+            "/api/chapters?stream=1",
+            method="POST",
+            body=json.dumps({"urls": urls}),
+            headers=dict(AUTH, Accept="application/x-ndjson"),
+        )
+        assert r.code == 200
+        assert r.headers["Content-Type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in r.body.decode().splitlines()]
+        assert sorted(line["index"] for line in lines) == [0, 1, 2]
+        assert {line["url"] for line in lines} == set(urls)
+        assert [line["error"] for line in sorted(lines, key=lambda line: line["index"])] == ["", "", "404"]
+
+    def test_load_next_n_chapters(self):
+        self.allow_all_hosts()
+        r = self.post("/api/load_next_n_chapters", {"url": "https://x.example/chuong-1", "count": 3, "refresh": True})
+        assert r.code == 200
+        data = json.loads(r.body)
+        assert data["final_url"] == "https://x.example/chuong-4"  # chương 3 lỗi, chương 4 tải được
+        assert data["text"].split("\n\n") == [
+            "text https://x.example/chuong-2",
+            "(Lỗi khi tải https://x.example/chuong-3: 404)",
+            "text https://x.example/chuong-4",
+        ]
+        assert self.submitted == [([f"https://x.example/chuong-{i}" for i in (2, 3, 4)], False)]
+
+        r = self.post("/api/load_next_n_chapters", {"url": "https://x.example/truyen/"})
+        assert json.loads(r.body)["error"]
+
+    def test_change_chapter_url(self):
+        r = self.post("/api/change_chapter_url", {"url": "https://x.example/chuong-009.html", "step": 2})
+        assert json.loads(r.body) == {"url": "https://x.example/chuong-011.html"}
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import reader
+from store import ReadingStore
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+CHAPTER = "http://h/chuong-2"
+TEXT = "Xin chào. Chương hai. " * 20
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    s = ReadingStore(str(tmp_path / "state.db"), flush_interval=60)
+    monkeypatch.setitem(reader._shared, "store", s)
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def app(store, monkeypatch):
+    def fake_load_content(url, use_cache=True):
+        if url == CHAPTER:
+            return (TEXT, "")
+        return ("", f"Lỗi khi tải {url}: 404")
+
+    monkeypatch.setattr(reader, "load_content", fake_load_content)
+    store.save_position("x", CHAPTER, [CHAPTER], 5)
+    at = AppTest.from_file(APP)
+    at.run()
+    assert at.session_state["current_url"] == ""  # chưa biết uid: chưa resume
+    report(at, 0)  # component báo uid từ localStorage
+    return at
+
+
+def report(at, offset, doc=None):
+    at.session_state["reader"] = {"uid": "x", "doc": doc or at.session_state["doc_key"], "offset": offset}
+    at.run()
+    assert not at.exception, at.exception
+
+
+def test_resume_and_save_offset(app, store):
+    assert app.session_state["current_url"] == CHAPTER
+    assert app.session_state["resume_offset"] == 5
+    assert store.get_position("x")["offset"] == 5  # offset 0 của doc trước resume bị bỏ qua
+
+    report(app, 42)
+    assert store.get_position("x")["offset"] == 42
+
+
+def test_failed_load_keeps_saved_offset(app, store):
+    report(app, 42)
+    app.session_state["current_url_input"] = "http://h/chuong-999"
+    app.session_state["pending_action"] = "load"
+    app.run()
+    assert app.session_state["error"]
+
+    report(app, 0)  # component nạp văn bản rỗng và báo offset 0
+    pos = store.get_position("x")
+    assert (pos["url"], pos["offset"]) == (CHAPTER, 42)
+
+    # nạp lại được chương thì offset mới lại được lưu
+    app.session_state["current_url_input"] = CHAPTER
+    app.session_state["pending_action"] = "load"
+    app.run()
+    report(app, 7)
+    assert store.get_position("x")["offset"] == 7
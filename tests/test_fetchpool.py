@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+import reader
+from fetchpool import FairFetchPool
+from ratelimit import HostLimiter
+
+
+def test_throttled_host_does_not_block_other_hosts():
+    # tình huống review: host A trả 429 Retry-After 3s, 29 chương A đang chờ
+    pool = FairFetchPool(max_workers=8, per_host=2)
+    limiter_a = HostLimiter(host="a")
+    limiter_a.acquire()
+    limiter_a.release(429, 0.1, "3")
+
+    def fetch_a():
+        limiter_a.acquire()
+        limiter_a.release(200, 0.01)
+
+    a_futures = [pool.submit("a", fetch_a) for _ in range(29)]
+    started = time.monotonic()
+    assert pool.submit("b", lambda: "b").result(timeout=5) == "b"
+    assert time.monotonic() - started < 0.5
+    for f in a_futures:
+        f.cancel()
+
+
+def test_per_host_slot_cap():
+    pool = FairFetchPool(max_workers=8, per_host=2)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def job():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    futures = [pool.submit("a", job) for _ in range(8)]
+    for f in futures:
+        f.result(timeout=5)
+    assert peak[0] == 2
+
+
+def test_batch_cap_and_order():
+    pool = FairFetchPool(max_workers=8, per_host=8)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def job(i):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02 * (5 - i % 5))
+        with lock:
+            running[0] -= 1
+        return i
+
+    futures = pool.submit_batch([(f"h{i % 3}", job, (i,)) for i in range(10)], max_parallel=3)
+    assert [f.result(timeout=5) for f in futures] == list(range(10))
+    assert peak[0] == 3
+
+
+def test_batch_propagates_errors_and_skips_cancelled():
+    pool = FairFetchPool(max_workers=2, per_host=2)
+    gate = threading.Event()
+    calls = []
+
+    def job(i):
+        calls.append(i)
+        gate.wait(5)
+        if i == 0:
+            raise ValueError("hỏng")
+        return i
+
+    futures = pool.submit_batch([("h", job, (i,)) for i in range(3)], max_parallel=1)
+    assert futures[2].cancel()
+    gate.set()
+    with pytest.raises(ValueError):
+        futures[0].result(timeout=5)
+    assert futures[1].result(timeout=5) == 1
+    assert futures[2].cancelled() and calls == [0, 1]
+
+
+def test_load_many_keeps_order_through_pool(monkeypatch):
+    monkeypatch.setattr(reader, "load_content", lambda url, use_cache=True: (url.upper(), ""))
+    urls = [f"http://h{i % 2}/chuong-{i}" for i in range(6)]
+    assert reader.load_many(urls) == [(u.upper(), "") for u in urls]
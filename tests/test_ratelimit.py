@@ -0,0 +1,105 @@
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from ratelimit import MAX_RETRY_AFTER, HostLimiter, RateLimiter, RateLimitTimeout, parse_retry_after
+
+
+def test_parse_retry_after_seconds_and_http_date():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(" 7 ") == 7.0
+    assert parse_retry_after("100000") == MAX_RETRY_AFTER
+    future = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= parse_retry_after(future) <= 30
+    past = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=30), usegmt=True)
+    assert parse_retry_after(past) == 0.0
+
+
+@pytest.mark.parametrize("value", [None, "", "soon", "-5"])
+def test_parse_retry_after_invalid(value):
+    assert parse_retry_after(value) is None
+
+
+def test_healthy_responses_ramp_up():
+    h = HostLimiter(rate=1.0, concurrency=2.0, rate_step=0.5)
+    for _ in range(4):
+        h.acquire()
+        h.release(200, 0.1)
+    assert h.limit > 2.0
+    assert h.rate == pytest.approx(3.0)
+    assert h.failures == 0
+
+
+def test_429_backs_off_and_blocks_for_retry_after():
+    h = HostLimiter(rate=4.0, concurrency=4.0)
+    h.acquire()
+    h.release(429, 0.1, "2")
+    assert h.limit == 2.0 and h.rate == 2.0
+    assert 1.5 < h.blocked_until - time.monotonic() <= 2.0
+    assert h.tokens == 0.0
+
+
+def test_429_without_header_uses_exponential_backoff():
+    h = HostLimiter()
+    h.acquire()
+    h.release(503, 0.1)
+    first = h.blocked_until - time.monotonic()
+    h.blocked_until = 0.0
+    h.tokens = 1.0
+    h.acquire()
+    h.release(503, 0.1)
+    assert 1.5 < first <= 2.0
+    assert 3.5 < h.blocked_until - time.monotonic() <= 4.0
+
+
+def test_network_error_and_latency_spike_decrease():
+    h = HostLimiter(rate=4.0, concurrency=4.0, latency_spike=3.0)
+    h.acquire()
+    h.release(None, 5.0)
+    assert (h.limit, h.rate) == (2.0, 2.0)
+    assert h.avg_latency == 0.0  # lỗi mạng không tính vào mốc độ trễ
+    h.acquire()
+    h.release(200, 0.1)
+    limit = h.limit
+    h.acquire()
+    h.release(200, 1.0)  # > 3x EWMA
+    assert h.limit == pytest.approx(max(1.0, limit * 0.5))
+
+
+def test_acquire_fails_fast_when_blocked_past_deadline():
+    h = HostLimiter(host="truyen.example")
+    h.acquire()
+    h.release(429, 0.1, "60")
+    started = time.monotonic()
+    with pytest.raises(RateLimitTimeout, match="truyen.example"):
+        h.acquire(deadline=started + 5)
+    assert time.monotonic() - started < 0.1
+
+
+def test_acquire_waits_for_retry_after_within_deadline():
+    h = HostLimiter()
+    h.acquire()
+    h.release(429, 0.1, "1")
+    h.tokens = 1.0
+    started = time.monotonic()
+    h.acquire(deadline=started + 5)
+    assert 0.9 < time.monotonic() - started < 1.5
+
+
+def test_concurrency_cap_respects_deadline():
+    h = HostLimiter(concurrency=1.0, burst=10.0)
+    h.acquire()
+    started = time.monotonic()
+    with pytest.raises(RateLimitTimeout):
+        h.acquire(deadline=started + 0.2)
+    assert 0.15 < time.monotonic() - started < 0.5
+
+
+def test_rate_limiter_keeps_one_limiter_per_host():
+    limiter = RateLimiter(rate=1.0)
+    a = limiter.for_url("https://A.example/chuong-1")
+    assert limiter.for_url("https://a.example/chuong-2") is a
+    assert limiter.for_url("https://b.example/chuong-1") is not a
+    assert a.host == "a.example" and a.rate == 1.0
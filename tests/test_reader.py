@@ -0,0 +1,108 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import reader
+from reader import BlockedURLError, change_chapter_url, check_url, configure_url_policy, next_chapter_urls
+
+PUBLIC = "http://93.184.216.34"
+
+
+@pytest.fixture(autouse=True)
+def reset_policy():
+    yield
+    configure_url_policy()
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, text="", location=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = {"Location": location} if location else {}
+        self.is_redirect = location is not None
+        self.encoding = self.apparent_encoding = "utf-8"
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class FakeSession:
+    def __init__(self, routes):
+        self.routes = routes
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        assert kwargs["allow_redirects"] is False
+        self.calls.append(url)
+        return self.routes[url]
+
+
+def test_change_chapter_url_keeps_padding_and_suffix():
+    assert change_chapter_url("https://h/truyen/chuong-009.html?x=1") == "https://h/truyen/chuong-010.html?x=1"
+    assert change_chapter_url("https://h/chuong-1", step=-1) == "https://h/chuong-1"
+    assert next_chapter_urls("https://h/chuong-1", 2) == ["https://h/chuong-2", "https://h/chuong-3"]
+    assert next_chapter_urls("https://h/truyen/", 2) == []
+
+
+def test_check_url_policy():
+    check_url("http://127.0.0.1/chuong-1")  # UI: mặc định không giới hạn
+    with pytest.raises(BlockedURLError):
+        check_url("file:///etc/passwd")
+    configure_url_policy(public_only=True)
+    check_url(PUBLIC + "/chuong-1")
+    for url in ("http://127.0.0.1/", "http://192.168.1.10/", "http://169.254.169.254/", "http://[::ffff:10.0.0.1]/"):
+        with pytest.raises(BlockedURLError):
+            check_url(url)
+    configure_url_policy(allowed_hosts=["truyen.example"])
+    check_url("https://www.truyen.example/chuong-1")
+    with pytest.raises(BlockedURLError):
+        check_url("https://eviltruyen.example/chuong-1")
+
+
+def test_fetch_html_checks_every_redirect_hop(monkeypatch):
+    configure_url_policy(public_only=True)
+    session = FakeSession({PUBLIC + "/chuong-1": FakeResponse(302, location="http://169.254.169.254/latest")})
+    monkeypatch.setattr(reader, "get_session", lambda: session)
+    with pytest.raises(BlockedURLError):
+        reader.fetch_html(PUBLIC + "/chuong-1")
+    assert session.calls == [PUBLIC + "/chuong-1"]
+
+
+def test_fetch_html_follows_allowed_redirects(monkeypatch):
+    session = FakeSession({
+        PUBLIC + "/chuong-1": FakeResponse(301, location="/truyen/chuong-1.html"),
+        PUBLIC + "/truyen/chuong-1.html": FakeResponse(200, text="<p>ok</p>"),
+    })
+    monkeypatch.setattr(reader, "get_session", lambda: session)
+    assert reader.fetch_html(PUBLIC + "/chuong-1") == "<p>ok</p>"
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.end_headers()
+        self.wfile.write(b"<p>ok</p>")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = HTTPServer(("127.0.0.1", 0), OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/chuong-1"
+    server.shutdown()
+    server.server_close()
+
+
+def test_connection_checks_peer_address(local_server, monkeypatch):
+    # giả lập DNS rebinding: check_url thấy địa chỉ public, lúc kết nối lại ra 127.0.0.1
+    monkeypatch.setattr(reader, "check_url", lambda url: None)
+    assert reader.fetch_html(local_server) == "<p>ok</p>"  # UI: không giới hạn
+    configure_url_policy(public_only=True)
+    with pytest.raises(BlockedURLError):
+        reader.fetch_html(local_server)
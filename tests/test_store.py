@@ -0,0 +1,111 @@
+import threading
+
+import pytest
+
+from store import ReadingStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    # flush_interval lớn: thread nền không tự flush trong lúc test
+    s = ReadingStore(str(tmp_path / "state.db"), flush_interval=60)
+    yield s
+    s.close()
+
+
+def test_read_after_write_before_flush(store):
+    store.save_position("u", "http://h/chuong-1", ["http://h/chuong-1"], 0)
+    store.save_offset("u", 42)
+    store.add_recent("u", "http://h/chuong-1", "1")
+    store.put_chapter("http://h/chuong-1", "nội dung")
+
+    pos = store.get_position("u")
+    assert (pos["url"], pos["urls"], pos["offset"]) == ("http://h/chuong-1", ["http://h/chuong-1"], 42)
+    assert [r["url"] for r in store.recent("u")] == ["http://h/chuong-1"]
+    assert store.get_chapter("http://h/chuong-1") == "nội dung"
+
+
+def test_flush_persists_across_instances(store, tmp_path):
+    store.save_position("u", "http://h/chuong-2", ["http://h/chuong-1", "http://h/chuong-2"], 5)
+    store.put_chapter("http://h/chuong-2", "hai")
+    store.flush()
+    store.save_offset("u", 9)  # chỉ cập nhật offset cho vị trí đã có trong DB
+    store.close()
+
+    reopened = ReadingStore(str(tmp_path / "state.db"), flush_interval=60)
+    try:
+        pos = reopened.get_position("u")
+        assert pos["urls"] == ["http://h/chuong-1", "http://h/chuong-2"]
+        assert pos["offset"] == 9
+        assert reopened.get_chapter("http://h/chuong-2") == "hai"
+        assert reopened.get_position("other") is None
+    finally:
+        reopened.close()
+
+
+def test_inflight_batch_visible_until_commit(store, monkeypatch):
+    store.save_position("u", "http://h/chuong-1", None, 0)
+    store.flush()
+    store.save_offset("u", 77)
+    store.put_chapter("http://h/chuong-1", "một")
+    store.add_recent("u", "http://h/chuong-1", "1")
+
+    entered, release = threading.Event(), threading.Event()
+    write_batch = store._write_batch
+
+    def slow_write(batch):
+        entered.set()
+        release.wait(5)
+        write_batch(batch)
+
+    monkeypatch.setattr(store, "_write_batch", slow_write)
+    flusher = threading.Thread(target=store.flush)
+    flusher.start()
+    assert entered.wait(5)
+    # lô đã rời bộ đệm nhưng chưa commit: đọc vẫn phải thấy giá trị mới
+    assert store.get_position("u")["offset"] == 77
+    assert store.get_chapter("http://h/chuong-1") == "một"
+    assert [r["url"] for r in store.recent("u")] == ["http://h/chuong-1"]
+    release.set()
+    flusher.join(5)
+    assert store.get_position("u")["offset"] == 77
+
+
+def test_recent_is_newest_first_and_capped(store):
+    for i in range(1, 5):
+        store.add_recent("u", f"http://h/chuong-{i}", str(i))
+    store.flush()
+    assert [r["chapter"] for r in store.recent("u", limit=3)] == ["4", "3", "2"]
+
+
+def test_chapter_cache_expires_after_ttl(tmp_path, monkeypatch):
+    s = ReadingStore(str(tmp_path / "state.db"), flush_interval=60, chapter_ttl=10)
+    try:
+        clock = [1000.0]
+        monkeypatch.setattr("store.time.time", lambda: clock[0])
+        s.put_chapter("http://h/chuong-1", "một")
+        assert s.get_chapter("http://h/chuong-1") == "một"
+        s.flush()
+        clock[0] += 11
+        assert s.get_chapter("http://h/chuong-1") is None
+        # lần flush có chương mới sẽ xóa các dòng đã hết hạn
+        s.put_chapter("http://h/chuong-2", "hai")
+        s.flush()
+        assert s._conn().execute("SELECT url FROM chapters").fetchall() == [("http://h/chuong-2",)]
+    finally:
+        s.close()
+
+
+def test_chapter_cache_row_cap_drops_oldest(tmp_path, monkeypatch):
+    s = ReadingStore(str(tmp_path / "state.db"), flush_interval=60, max_chapters=3)
+    try:
+        clock = [1000.0]
+        monkeypatch.setattr("store.time.time", lambda: clock[0])
+        for i in range(1, 6):
+            clock[0] += 1
+            s.put_chapter(f"http://h/chuong-{i}", str(i))
+            s.flush()
+        assert s.get_chapter("http://h/chuong-2") is None
+        assert [s.get_chapter(f"http://h/chuong-{i}") for i in (3, 4, 5)] == ["3", "4", "5"]
+    finally:
+        s.close()